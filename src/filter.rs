@@ -6,6 +6,71 @@ use log::{debug, error};
 use std::fs;
 use std::path::Path;
 
+/// A compiled glob pattern.
+pub enum CompiledPattern {
+    /// A `*` followed by a literal without path separators, such as `*.py`, which matches the paths ending with that literal.
+    Suffix(String),
+    /// Any other glob pattern.
+    Glob(Pattern),
+}
+
+impl CompiledPattern {
+    /// Compiles a glob pattern, recognizing plain `*<literal>` patterns.
+    ///
+    /// # Arguments
+    ///
+    /// * `pattern` - The glob pattern.
+    ///
+    /// # Returns
+    ///
+    /// * `CompiledPattern` - The compiled pattern.
+    pub fn new(pattern: &str) -> Self {
+        // `*` also matches path separators, so `*<literal>` is a plain suffix test. A literal
+        // with a separator is left to glob, which treats `/` and `\` alike on Windows.
+        match pattern.strip_prefix('*') {
+            Some(suffix)
+                if !suffix.contains(|c| matches!(c, '*' | '?' | '[' | ']'))
+                    && !suffix.contains(std::path::is_separator) =>
+            {
+                CompiledPattern::Suffix(suffix.to_string())
+            }
+            _ => CompiledPattern::Glob(Pattern::new(pattern).unwrap()),
+        }
+    }
+
+    /// Checks whether the pattern matches a path.
+    ///
+    /// # Arguments
+    ///
+    /// * `path` - The path to match.
+    ///
+    /// # Returns
+    ///
+    /// * `bool` - `true` if the pattern matches the path, `false` otherwise.
+    pub fn matches(&self, path: &str) -> bool {
+        match self {
+            CompiledPattern::Suffix(suffix) => path.ends_with(suffix.as_str()),
+            CompiledPattern::Glob(pattern) => pattern.matches(path),
+        }
+    }
+}
+
+/// Compiles glob patterns so they can be matched against many paths.
+///
+/// # Arguments
+///
+/// * `patterns` - A slice of strings representing the glob patterns.
+///
+/// # Returns
+///
+/// * `Vec<CompiledPattern>` - The compiled patterns.
+pub fn compile_patterns(patterns: &[String]) -> Vec<CompiledPattern> {
+    patterns
+        .iter()
+        .map(|pattern| CompiledPattern::new(pattern))
+        .collect()
+}
+
 /// Determines whether a file should be included based on include and exclude patterns.
 ///
 /// # Arguments
@@ -23,6 +88,32 @@ pub fn should_include_file(
     include_patterns: &[String],
     exclude_patterns: &[String],
     include_priority: bool,
+) -> bool {
+    should_include_path(
+        path,
+        &compile_patterns(include_patterns),
+        &compile_patterns(exclude_patterns),
+        include_priority,
+    )
+}
+
+/// Determines whether a file should be included based on already compiled include and exclude patterns.
+///
+/// # Arguments
+///
+/// * `path` - The path to the file to be checked.
+/// * `include_patterns` - A slice of compiled include patterns.
+/// * `exclude_patterns` - A slice of compiled exclude patterns.
+/// * `include_priority` - A boolean indicating whether to give priority to include patterns if both include and exclude patterns match.
+///
+/// # Returns
+///
+/// * `bool` - `true` if the file should be included, `false` otherwise.
+pub fn should_include_path(
+    path: &Path,
+    include_patterns: &[CompiledPattern],
+    exclude_patterns: &[CompiledPattern],
+    include_priority: bool,
 ) -> bool {
     // ~~~ Clean path ~~~
     let canonical_path = match fs::canonicalize(path) {
@@ -37,10 +128,10 @@ pub fn should_include_file(
     // ~~~ Check glob patterns ~~~
     let included = include_patterns
         .iter()
-        .any(|pattern| Pattern::new(pattern).unwrap().matches(path_str));
+        .any(|pattern| pattern.matches(path_str));
     let excluded = exclude_patterns
         .iter()
-        .any(|pattern| Pattern::new(pattern).unwrap().matches(path_str));
+        .any(|pattern| pattern.matches(path_str));
 
     // ~~~ Decision ~~~
     let result = match (included, excluded) {
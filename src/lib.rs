@@ -4,9 +4,9 @@ pub mod path;
 pub mod template;
 pub mod token;
 
-pub use filter::should_include_file;
+pub use filter::{compile_patterns, should_include_file, should_include_path, CompiledPattern};
 pub use git::{get_git_diff, get_git_diff_between_branches, get_git_log};
-pub use path::{label, traverse_directory};
+pub use path::{label, traverse_directory, TraverseConfig};
 pub use template::{
     copy_to_clipboard, handle_undefined_variables, handlebars_setup, render_template, write_to_file,
 };
@@ -8,11 +8,13 @@ use clap::Parser;
 use code2prompt::{
     copy_to_clipboard, get_model_info, get_tokenizer, get_git_diff, get_git_diff_between_branches, get_git_log,
     handle_undefined_variables, handlebars_setup, label, render_template, traverse_directory, write_to_file,
+    TraverseConfig,
 };
 use colored::*;
 use indicatif::{ProgressBar, ProgressStyle};
 use log::{debug, error};
-use serde_json::json;
+use serde_json::{Map, Value};
+use std::borrow::Cow;
 use std::path::PathBuf;
 
 // Constants
@@ -40,6 +42,9 @@ struct Cli {
     include_priority: bool,
 
     /// Exclude files/folders from the source tree based on exclude patterns
+    ///
+    /// With absolute include patterns, folders outside their shared directory prefix
+    /// are not walked, so symlinks inside those folders are not followed into it.
     #[clap(long)]
     exclude_from_tree: bool,    
 
@@ -105,80 +110,58 @@ fn main() -> Result<()> {
     // Progress Bar Setup
     let spinner = setup_spinner("Traversing directory and building tree...");
 
-    // Parse Patterns
-    let include_patterns = parse_patterns(&args.include);
-    let exclude_patterns = parse_patterns(&args.exclude);
-
-    // Traverse the directory
-    let create_tree = traverse_directory(
-        &args.path,
-        &include_patterns,
-        &exclude_patterns,
-        args.include_priority,
-        args.line_number,
-        args.relative_paths,
-        args.exclude_from_tree,
-        args.no_codeblock,
-    );
-
-    let (tree, files) = match create_tree {
-        Ok(result) => result,
-        Err(e) => {
-            spinner.finish_with_message("Failed!".red().to_string());
-            eprintln!(
-                "{}{}{} {}",
-                "[".bold().white(),
-                "!".bold().red(),
-                "]".bold().white(),
-                format!("Failed to build directory tree: {}", e).red()
-            );
-            std::process::exit(1);
-        }
-    };
-
-    // Git Diff
-    let git_diff = if args.diff {
-        spinner.set_message("Generating git diff...");
-        get_git_diff(&args.path).unwrap_or_default()
-    } else {
-        String::new()
+    // Traversal Options
+    let config = TraverseConfig {
+        include: parse_patterns(&args.include),
+        exclude: parse_patterns(&args.exclude),
+        include_priority: args.include_priority,
+        line_number: args.line_number,
+        relative_paths: args.relative_paths,
+        exclude_from_tree: args.exclude_from_tree,
+        no_codeblock: args.no_codeblock,
     };
 
-    // git diff two get_git_diff_between_branches
-    let mut git_diff_branch: String = String::new();
-    if let Some(branches) = &args.git_diff_branch {
-        spinner.set_message("Generating git diff between two branches...");
-        let branches = parse_patterns(&Some(branches.to_string()));
-        if branches.len() != 2 {
-            error!("Please provide exactly two branches separated by a comma.");
-            std::process::exit(1);
-        }
-        git_diff_branch = get_git_diff_between_branches(&args.path, &branches[0], &branches[1]).unwrap_or_default()
+    // Branch arguments are checked up front so a bad one fails before any work starts
+    let diff_branches = parse_branches(&args.git_diff_branch);
+    let log_branches = parse_branches(&args.git_log_branch);
+    if args.diff || diff_branches.is_some() || log_branches.is_some() {
+        spinner.set_message("Traversing directory and running git operations...");
     }
 
-    // git diff two get_git_diff_between_branches
-    let mut git_log_branch: String = String::new();
-    if let Some(branches) = &args.git_log_branch {
-        spinner.set_message("Generating git log between two branches...");
-        let branches = parse_patterns(&Some(branches.to_string()));
-        if branches.len() != 2 {
-            error!("Please provide exactly two branches separated by a comma.");
-            std::process::exit(1);
-        }
-        git_log_branch = get_git_log(&args.path, &branches[0], &branches[1]).unwrap_or_default()
-    }
+    // Traverse the directory while the git operations run on their own thread
+    let (tree, files, (git_diff, git_diff_branch, git_log_branch)) = std::thread::scope(|scope| {
+        let git_task = scope.spawn(|| get_git_info(&args, &diff_branches, &log_branches));
+
+        let (tree, files) = match traverse_directory(&args.path, &config) {
+            Ok(result) => result,
+            Err(e) => {
+                spinner.finish_with_message("Failed!".red().to_string());
+                eprintln!(
+                    "{}{}{} {}",
+                    "[".bold().white(),
+                    "!".bold().red(),
+                    "]".bold().white(),
+                    format!("Failed to build directory tree: {}", e).red()
+                );
+                std::process::exit(1);
+            }
+        };
+
+        (tree, files, git_task.join().expect("Git thread panicked"))
+    });
 
     spinner.finish_with_message("Done!".green().to_string());
     
     // Prepare JSON Data
-    let mut data = json!({
-        "absolute_code_path": label(&args.path),
-        "source_tree": tree,
-        "files": files,
-        "git_diff": git_diff,
-        "git_diff_branch": git_diff_branch,
-        "git_log_branch": git_log_branch
-    });
+    let directory_name = label(&args.path);
+    let mut data = Value::Object(Map::from_iter([
+        ("absolute_code_path".to_string(), directory_name.clone().into()),
+        ("source_tree".to_string(), tree.into()),
+        ("files".to_string(), files.into()),
+        ("git_diff".to_string(), git_diff.into()),
+        ("git_diff_branch".to_string(), git_diff_branch.into()),
+        ("git_log_branch".to_string(), git_log_branch.into()),
+    ]));
 
     debug!(
         "JSON Data: {}",
@@ -199,20 +182,23 @@ fn main() -> Result<()> {
         0
     };
 
-    let paths: Vec<String> = files.iter()
-        .filter_map(|file| file.get("path").and_then(|p| p.as_str()).map(|s| s.to_string()))
-        .collect();
-
     let model_info = get_model_info(&args.encoding);
 
     if args.json {
-        let json_output = json!({
-            "prompt": rendered,
-            "directory_name": label(&args.path),
-            "token_count": token_count,
-            "model_info": model_info,
-            "files": paths,
-        });
+        let paths: Vec<String> = data["files"]
+            .as_array()
+            .into_iter()
+            .flatten()
+            .filter_map(|file| file.get("path").and_then(|p| p.as_str()).map(|s| s.to_string()))
+            .collect();
+
+        let json_output = Value::Object(Map::from_iter([
+            ("prompt".to_string(), rendered.into()),
+            ("directory_name".to_string(), directory_name.into()),
+            ("token_count".to_string(), token_count.into()),
+            ("model_info".to_string(), model_info.into()),
+            ("files".to_string(), paths.into()),
+        ]));
         println!("{}", serde_json::to_string_pretty(&json_output)?);
         return Ok(());
     } else {
@@ -241,6 +227,62 @@ fn main() -> Result<()> {
     Ok(())
 }
 
+/// Runs the git operations requested on the command line
+///
+/// # Arguments
+///
+/// * `args` - The parsed CLI arguments
+/// * `diff_branches` - The two branches to diff, if requested
+/// * `log_branches` - The two branches to retrieve the log between, if requested
+///
+/// # Returns
+///
+/// * `(String, String, String)` - The git diff, the git diff between branches and the git log between branches
+fn get_git_info(
+    args: &Cli,
+    diff_branches: &Option<Vec<String>>,
+    log_branches: &Option<Vec<String>>,
+) -> (String, String, String) {
+    // Git Diff
+    let git_diff = if args.diff {
+        get_git_diff(&args.path).unwrap_or_default()
+    } else {
+        String::new()
+    };
+
+    // git diff two get_git_diff_between_branches
+    let git_diff_branch = match diff_branches {
+        Some(branches) => get_git_diff_between_branches(&args.path, &branches[0], &branches[1]).unwrap_or_default(),
+        None => String::new(),
+    };
+
+    // git log between two branches
+    let git_log_branch = match log_branches {
+        Some(branches) => get_git_log(&args.path, &branches[0], &branches[1]).unwrap_or_default(),
+        None => String::new(),
+    };
+
+    (git_diff, git_diff_branch, git_log_branch)
+}
+
+/// Parses a comma-separated pair of branch names, exiting if it is not exactly two
+///
+/// # Arguments
+///
+/// * `branches` - An optional string containing two comma-separated branch names
+///
+/// # Returns
+///
+/// * `Option<Vec<String>>` - The two branch names, or `None` if none were given
+fn parse_branches(branches: &Option<String>) -> Option<Vec<String>> {
+    let branches = parse_patterns(&Some(branches.as_ref()?.to_string()));
+    if branches.len() != 2 {
+        error!("Please provide exactly two branches separated by a comma.");
+        std::process::exit(1);
+    }
+    Some(branches)
+}
+
 /// Sets up a progress spinner with a given message
 ///
 /// # Arguments
@@ -289,15 +331,16 @@ fn parse_patterns(patterns: &Option<String>) -> Vec<String> {
 ///
 /// # Returns
 ///
-/// * `Result<(String, &str)>` - A tuple containing the template content and name
-fn get_template(args: &Cli) -> Result<(String, &str)> {
+/// * `Result<(Cow<'static, str>, &str)>` - A tuple containing the template content and name
+fn get_template(args: &Cli) -> Result<(Cow<'static, str>, &str)> {
     if let Some(template_path) = &args.template {
         let content = std::fs::read_to_string(template_path)
             .context("Failed to read custom template file")?;
-        Ok((content, CUSTOM_TEMPLATE_NAME))
+        Ok((Cow::Owned(content), CUSTOM_TEMPLATE_NAME))
     } else {
+        // The embedded template is only ever read, so borrow it instead of copying it
         Ok((
-            include_str!("default_template.hbs").to_string(),
+            Cow::Borrowed(include_str!("default_template.hbs")),
             DEFAULT_TEMPLATE_NAME,
         ))
     }
@@ -1,108 +1,252 @@
 //! This module contains the functions for traversing the directory and processing the files.
 
-use crate::filter::should_include_file;
+use crate::filter::{compile_patterns, should_include_path};
 use anyhow::Result;
-use ignore::WalkBuilder;
+use ignore::{WalkBuilder, WalkState};
 use log::debug;
-use serde_json::json;
+use std::fmt::Write;
 use std::fs;
-use std::path::Path;
+use std::path::{Path, PathBuf};
+use std::sync::mpsc;
 use termtree::Tree;
 
+/// The options controlling which files are traversed and how they are rendered.
+#[derive(Debug, Default)]
+pub struct TraverseConfig {
+    /// The patterns of files to include.
+    pub include: Vec<String>,
+    /// The patterns of files to exclude.
+    pub exclude: Vec<String>,
+    /// Whether to give priority to include patterns.
+    pub include_priority: bool,
+    /// Whether to add line numbers to the code.
+    pub line_number: bool,
+    /// Whether to use relative paths.
+    pub relative_paths: bool,
+    /// Whether to exclude filtered out files and folders from the tree.
+    pub exclude_from_tree: bool,
+    /// Whether to not wrap the code with a delimiter.
+    pub no_codeblock: bool,
+}
+
 /// Traverses the directory and returns the string representation of the tree and the vector of JSON file representations.
 ///
 /// # Arguments
 ///
 /// * `root_path` - The path to the root directory.
-/// * `include` - The patterns of files to include.
-/// * `exclude` - The patterns of files to exclude.
-/// * `include_priority` - Whether to give priority to include patterns.
-/// * `line_number` - Whether to add line numbers to the code.
-/// * `relative_paths` - Whether to use relative paths.
+/// * `config` - The traversal and rendering options.
 ///
 /// # Returns
 ///
 /// A tuple containing the string representation of the directory tree and a vector of JSON representations of the files.
 pub fn traverse_directory(
     root_path: &Path,
-    include: &[String],
-    exclude: &[String],
-    include_priority: bool,
-    line_number: bool,
-    relative_paths: bool,
-    exclude_from_tree: bool,
-    no_codeblock: bool,
+    config: &TraverseConfig,
 ) -> Result<(String, Vec<serde_json::Value>)> {
     // ~~~ Initialization ~~~
-    let mut files = Vec::new();
     let canonical_root_path = root_path.canonicalize()?;
     let parent_directory = label(&canonical_root_path);
+    let include_patterns = compile_patterns(&config.include);
+    let exclude_patterns = compile_patterns(&config.exclude);
 
-    // ~~~ Build the Tree ~~~
-    let tree = WalkBuilder::new(&canonical_root_path)
-        .git_ignore(true)
-        .build()
-        .filter_map(|e| e.ok())
-        .fold(Tree::new(parent_directory.to_owned()), |mut root, entry| {
+    // ~~~ Prune the walk ~~~
+    // When only included files end up in the tree, directories that neither lead to
+    // nor sit under the literal prefix shared by every include pattern hold no match.
+    // They are pruned instead of starting the walk at the prefix, so the hidden and
+    // gitignore rules still apply to the prefix and its parents.
+    let prune_prefix = if config.exclude_from_tree && !config.include.is_empty() {
+        let prefix = glob_literal_prefix(&config.include);
+        (prefix.starts_with(&canonical_root_path) && prefix != canonical_root_path).then_some(prefix)
+    } else {
+        None
+    };
+
+    let mut walker = WalkBuilder::new(&canonical_root_path);
+    walker.git_ignore(true);
+    if let Some(prefix) = prune_prefix {
+        debug!("Pruning directories outside: {}", prefix.display());
+        walker.filter_entry(move |entry| {
+            // Only directories are pruned: a file or symlink may still resolve into the prefix
+            let is_dir = entry.file_type().map_or(false, |file_type| file_type.is_dir());
             let path = entry.path();
-            if let Ok(relative_path) = path.strip_prefix(&canonical_root_path) {
-                let mut current_tree = &mut root;
-                for component in relative_path.components() {
-                    let component_str = component.as_os_str().to_string_lossy().to_string();
-
-                    // Check if the current component should be excluded from the tree
-                    if exclude_from_tree && !should_include_file(path, include, exclude, include_priority) {
-                        break;
-                    }
-
-                    current_tree = if let Some(pos) = current_tree
-                        .leaves
-                        .iter_mut()
-                        .position(|child| child.root == component_str)
-                    {
-                        &mut current_tree.leaves[pos]
-                    } else {
-                        let new_tree = Tree::new(component_str.clone());
-                        current_tree.leaves.push(new_tree);
-                        current_tree.leaves.last_mut().unwrap()
+            !is_dir || prefix.starts_with(path) || path.starts_with(&prefix)
+        });
+    }
+
+    // ~~~ Walk and process entries in parallel ~~~
+    let (sender, receiver) = mpsc::channel();
+    walker
+        .build_parallel()
+        .run(|| {
+            let sender = sender.clone();
+            let include_patterns = &include_patterns;
+            let exclude_patterns = &exclude_patterns;
+            let canonical_root_path = &canonical_root_path;
+            let parent_directory = &parent_directory;
+            Box::new(move |result| {
+                let entry = match result {
+                    Ok(entry) => entry,
+                    Err(_) => return WalkState::Continue,
+                };
+                let path = entry.path();
+                if let Ok(relative_path) = path.strip_prefix(canonical_root_path) {
+                    // The walker already knows the entry type, only symlinks need a stat to resolve
+                    let is_file = match entry.file_type() {
+                        Some(file_type) if file_type.is_symlink() => path.is_file(),
+                        Some(file_type) => file_type.is_file(),
+                        None => false,
                     };
-                }
 
-                // ~~~ Process the file ~~~
-                if path.is_file() && should_include_file(path, include, exclude, include_priority) {
-                    if let Ok(code_bytes) = fs::read(path) {
-                        let code = String::from_utf8_lossy(&code_bytes);
-
-                        let code_block = wrap_code_block(&code, path.extension().and_then(|ext| ext.to_str()).unwrap_or(""), line_number, no_codeblock);
-
-                        if !code.trim().is_empty() && !code.contains(char::REPLACEMENT_CHARACTER) {
-                            let file_path = if relative_paths {
-                                format!("{}/{}", parent_directory, relative_path.display())
-                            } else {
-                                path.display().to_string()
-                            };
-
-                            files.push(json!({
-                                "path": file_path,
-                                "extension": path.extension().and_then(|ext| ext.to_str()).unwrap_or(""),
-                                "code": code_block,
-                            }));
-                            debug!(target: "included_files", "Included file: {}", file_path);
-                        } else {
-                            debug!("Excluded file (empty or invalid UTF-8): {}", path.display());
-                        }
+                    // The filter decision only depends on the entry path, so evaluate it once,
+                    // and only when it is used: for files, or for every entry of a filtered tree
+                    let included = (config.exclude_from_tree || is_file)
+                        && should_include_path(path, include_patterns, exclude_patterns, config.include_priority);
+
+                    // ~~~ Process the file ~~~
+                    let file = if is_file && included {
+                        process_file(path, relative_path, parent_directory, config)
                     } else {
-                        debug!("Failed to read file: {}", path.display());
-                    }
-                } else {
-                    debug!("Excluded file: {:?}", path.display());
+                        debug!("Excluded file: {:?}", path.display());
+                        None
+                    };
+
+                    let _ = sender.send((relative_path.to_path_buf(), included, file));
                 }
+                WalkState::Continue
+            })
+        });
+    drop(sender);
+
+    // Parallel workers finish in any order, sort to keep the output deterministic
+    let mut entries: Vec<(PathBuf, bool, Option<serde_json::Value>)> = receiver.into_iter().collect();
+    entries.sort_by(|a, b| a.0.cmp(&b.0));
+
+    // ~~~ Build the Tree ~~~
+    let mut files = Vec::new();
+    let mut root = Tree::new(parent_directory.to_owned());
+    for (relative_path, included, file) in entries {
+        let mut current_tree = &mut root;
+        for component in relative_path.components() {
+            // Borrowed for the lookup, only allocated when a new node is created
+            let component_str = component.as_os_str().to_string_lossy();
+
+            // Check if the current component should be excluded from the tree
+            if config.exclude_from_tree && !included {
+                break;
             }
 
-            root
-        });
+            current_tree = if let Some(pos) = current_tree
+                .leaves
+                .iter_mut()
+                .position(|child| child.root == component_str)
+            {
+                &mut current_tree.leaves[pos]
+            } else {
+                let new_tree = Tree::new(component_str.into_owned());
+                current_tree.leaves.push(new_tree);
+                current_tree.leaves.last_mut().unwrap()
+            };
+        }
+
+        if let Some(file) = file {
+            files.push(file);
+        }
+    }
+
+    Ok((root.to_string(), files))
+}
 
-    Ok((tree.to_string(), files))
+/// Reads a file and returns its JSON representation for the template.
+///
+/// The record is assembled from owned values rather than with `json!`, which serializes
+/// its arguments by reference and would copy the code block.
+///
+/// # Arguments
+///
+/// * `path` - The path to the file.
+/// * `relative_path` - The path of the file relative to the root directory.
+/// * `parent_directory` - The label of the root directory.
+/// * `config` - The traversal and rendering options.
+///
+/// # Returns
+///
+/// * `Option<serde_json::Value>` - The file representation, or `None` if the file is unreadable, empty or not valid UTF-8.
+fn process_file(
+    path: &Path,
+    relative_path: &Path,
+    parent_directory: &str,
+    config: &TraverseConfig,
+) -> Option<serde_json::Value> {
+    let code_bytes = match fs::read(path) {
+        Ok(code_bytes) => code_bytes,
+        Err(_) => {
+            debug!("Failed to read file: {}", path.display());
+            return None;
+        }
+    };
+    // Take ownership of the bytes read: valid UTF-8 is reused without another copy
+    let code = match String::from_utf8(code_bytes) {
+        Ok(code) if !code.trim().is_empty() && !code.contains(char::REPLACEMENT_CHARACTER) => code,
+        _ => {
+            debug!("Excluded file (empty or invalid UTF-8): {}", path.display());
+            return None;
+        }
+    };
+    let extension = path.extension().and_then(|ext| ext.to_str()).unwrap_or("");
+
+    let code_block = wrap_code_block(code, extension, config.line_number, config.no_codeblock);
+
+    let file_path = if config.relative_paths {
+        format!("{}/{}", parent_directory, relative_path.display())
+    } else {
+        path.display().to_string()
+    };
+
+    debug!(target: "included_files", "Included file: {}", file_path);
+    Some(serde_json::Value::Object(serde_json::Map::from_iter([
+        ("path".to_string(), file_path.into()),
+        ("extension".to_string(), extension.into()),
+        ("code".to_string(), code_block.into()),
+    ])))
+}
+
+/// Returns the longest literal directory prefix shared by all the glob patterns.
+///
+/// # Arguments
+///
+/// * `patterns` - The glob patterns to inspect.
+///
+/// # Returns
+///
+/// * `PathBuf` - The common prefix, empty if the patterns share none.
+pub fn glob_literal_prefix(patterns: &[String]) -> PathBuf {
+    let literal_dirs = |pattern: &str| -> Vec<PathBuf> {
+        Path::new(pattern)
+            .parent()
+            .map(|dir| {
+                dir.components()
+                    .map(|component| PathBuf::from(component.as_os_str()))
+                    .take_while(|component| {
+                        !component
+                            .to_string_lossy()
+                            .contains(|c| matches!(c, '*' | '?' | '[' | '{'))
+                    })
+                    .collect()
+            })
+            .unwrap_or_default()
+    };
+
+    let mut prefix = match patterns.first() {
+        Some(pattern) => literal_dirs(pattern),
+        None => return PathBuf::new(),
+    };
+    for pattern in &patterns[1..] {
+        let dirs = literal_dirs(pattern);
+        let common = prefix.iter().zip(&dirs).take_while(|(a, b)| a == b).count();
+        prefix.truncate(common);
+    }
+
+    prefix.iter().collect()
 }
 
 /// Returns the file name or the string representation of the path.
@@ -143,17 +287,20 @@ pub fn label<P: AsRef<Path>>(p: P) -> String {
 /// # Returns
 ///
 /// * `String` - The wrapped code block.
-fn wrap_code_block(code: &str, extension: &str, line_numbers: bool, no_codeblock: bool) -> String {
+fn wrap_code_block(code: String, extension: &str, line_numbers: bool, no_codeblock: bool) -> String {
     let delimiter = "`".repeat(3);
-    let mut code_with_line_numbers = String::new();
-
-    if line_numbers {
+    let code_with_line_numbers = if line_numbers {
+        // Size the buffer for the code plus a "{:4} | " prefix per line and format
+        // straight into it, instead of allocating a temporary string per line
+        let line_count = code.lines().count();
+        let mut code_with_line_numbers = String::with_capacity(code.len() + line_count * 8);
         for (line_number, line) in code.lines().enumerate() {
-            code_with_line_numbers.push_str(&format!("{:4} | {}\n", line_number + 1, line));
+            writeln!(code_with_line_numbers, "{:4} | {}", line_number + 1, line).unwrap();
         }
+        code_with_line_numbers
     } else {
-        code_with_line_numbers = code.to_string();
-    }
+        code
+    };
 
     if no_codeblock {
         code_with_line_numbers
@@ -6,8 +6,12 @@ use arboard::Clipboard;
 use colored::*;
 use handlebars::{no_escape, Handlebars};
 use inquire::Text;
+use once_cell::sync::Lazy;
 use regex::Regex;
-use std::io::Write;
+
+/// Matches `{{ variable }}` placeholders, compiled once on first use.
+static VARIABLE_REGEX: Lazy<Regex> =
+    Lazy::new(|| Regex::new(r"\{\{\s*(?P<var>[a-zA-Z_][a-zA-Z_0-9]*)\s*\}\}").unwrap());
 
 /// Set up the Handlebars template engine with a template string and a template name.
 ///
@@ -41,8 +45,8 @@ pub fn handlebars_setup(template_str: &str, template_name: &str) -> Result<Handl
 /// * `Vec<String>` - A vector of undefined variable names.
 pub fn extract_undefined_variables(template: &str) -> Vec<String> {
     let registered_identifiers = ["path", "code", "git_diff"];
-    let re = Regex::new(r"\{\{\s*(?P<var>[a-zA-Z_][a-zA-Z_0-9]*)\s*\}\}").unwrap();
-    re.captures_iter(template)
+    VARIABLE_REGEX
+        .captures_iter(template)
         .map(|cap| cap["var"].to_string())
         .filter(|var| !registered_identifiers.contains(&var.as_str()))
         .collect()
@@ -64,10 +68,16 @@ pub fn render_template(
     template_name: &str,
     data: &serde_json::Value,
 ) -> Result<String> {
-    let rendered = handlebars
+    let mut rendered = handlebars
         .render(template_name, data)
         .map_err(|e| anyhow::anyhow!("Failed to render template: {}", e))?;
-    Ok(rendered.trim().to_string())
+
+    // Trim in place instead of copying the whole prompt into a new string
+    let end = rendered.trim_end().len();
+    rendered.truncate(end);
+    let start = rendered.len() - rendered.trim_start().len();
+    rendered.drain(..start);
+    Ok(rendered)
 }
 
 /// Handles user-defined variables in the template and adds them to the data.
@@ -141,9 +151,7 @@ pub fn copy_to_clipboard(rendered: &str) -> Result<()> {
 ///
 /// * `Result<()>` - An empty result indicating success or an error.
 pub fn write_to_file(output_path: &str, rendered: &str) -> Result<()> {
-    let file = std::fs::File::create(output_path)?;
-    let mut writer = std::io::BufWriter::new(file);
-    write!(writer, "{}", rendered)?;
+    std::fs::write(output_path, rendered)?;
     println!(
         "{}{}{} {}",
         "[".bold().white(),
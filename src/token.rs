@@ -1,8 +1,15 @@
 //! This module encapsulates the logic for counting the tokens in the rendered text.
 
 use colored::*;
+use once_cell::sync::Lazy;
 use tiktoken_rs::{cl100k_base, p50k_base, p50k_edit, r50k_base, CoreBPE};
 
+// Each tokenizer is built on first use and shared for the rest of the process
+static CL100K: Lazy<CoreBPE> = Lazy::new(|| cl100k_base().unwrap());
+static P50K: Lazy<CoreBPE> = Lazy::new(|| p50k_base().unwrap());
+static P50K_EDIT: Lazy<CoreBPE> = Lazy::new(|| p50k_edit().unwrap());
+static R50K: Lazy<CoreBPE> = Lazy::new(|| r50k_base().unwrap());
+
 /// Returns the appropriate tokenizer based on the provided encoding.
 ///
 /// # Arguments
@@ -12,14 +19,14 @@ use tiktoken_rs::{cl100k_base, p50k_base, p50k_edit, r50k_base, CoreBPE};
 ///
 /// # Returns
 ///
-/// * `CoreBPE` - The tokenizer corresponding to the specified encoding.
-pub fn get_tokenizer(encoding: &Option<String>) -> CoreBPE {
+/// * `&'static CoreBPE` - The cached tokenizer corresponding to the specified encoding.
+pub fn get_tokenizer(encoding: &Option<String>) -> &'static CoreBPE {
     match encoding.as_deref().unwrap_or("cl100k") {
-        "cl100k" => cl100k_base().unwrap(),
-        "p50k" => p50k_base().unwrap(),
-        "p50k_edit" => p50k_edit().unwrap(),
-        "r50k" | "gpt2" => r50k_base().unwrap(),
-        _ => cl100k_base().unwrap(),
+        "cl100k" => &CL100K,
+        "p50k" => &P50K,
+        "p50k_edit" => &P50K_EDIT,
+        "r50k" | "gpt2" => &R50K,
+        _ => &CL100K,
     }
 }
 
@@ -51,21 +58,10 @@ pub fn get_model_info(encoding: &Option<String>) -> &'static str {
 /// * `encoding` - An optional string specifying the encoding to use for token counting.
 ///                Supported encodings: "cl100k" (default), "p50k", "p50k_edit", "r50k", "gpt2".
 pub fn count_tokens(rendered: &str, encoding: &Option<String>) {
-    let (bpe, model_info) = match encoding.as_deref().unwrap_or("cl100k") {
-        "cl100k" => (cl100k_base(), "ChatGPT models, text-embedding-ada-002"),
-        "p50k" => (
-            p50k_base(),
-            "Code models, text-davinci-002, text-davinci-003",
-        ),
-        "p50k_edit" => (
-            p50k_edit(),
-            "Edit models like text-davinci-edit-001, code-davinci-edit-001",
-        ),
-        "r50k" | "gpt2" => (r50k_base(), "GPT-3 models like davinci"),
-        _ => (cl100k_base(), "ChatGPT models, text-embedding-ada-002"),
-    };
-
-    let token_count = bpe.unwrap().encode_with_special_tokens(rendered).len();
+    let token_count = get_tokenizer(encoding)
+        .encode_with_special_tokens(rendered)
+        .len();
+    let model_info = get_model_info(encoding);
 
     println!(
         "{}{}{} Token count: {}, Model info: {}",
@@ -1,13 +1,13 @@
 use assert_cmd::Command;
 use colored::*;
 use log::{debug, info};
+use once_cell::sync::Lazy;
 use predicates::prelude::*;
 use predicates::str::contains;
-use std::fs::{self, read_to_string, File};
-use std::io::Write;
+use std::fs::{self, read_to_string};
 use std::path::Path;
 use std::sync::Once;
-use tempfile::tempdir;
+use tempfile::{tempdir, TempDir};
 
 static INIT: Once = Once::new();
 
@@ -25,12 +25,17 @@ fn create_temp_file(dir: &Path, name: &str, content: &str) {
     let file_path = dir.join(name);
     let parent_dir = file_path.parent().unwrap();
     fs::create_dir_all(parent_dir).expect(&format!("Failed to create directory: {:?}", parent_dir));
-    let mut file =
-        File::create(&file_path).expect(&format!("Failed to create temp file: {:?}", file_path));
-    //debug!("Writing to file: {:?}", file_path);
-    writeln!(file, "{}", content).expect(&format!("Failed to write to temp file: {:?}", file_path));
+    fs::write(&file_path, format!("{}\n", content))
+        .expect(&format!("Failed to write to temp file: {:?}", file_path));
 }
 
+// The hierarchy is only read by the tests, so it is built once and shared by all of them
+static TEST_DIR: Lazy<TempDir> = Lazy::new(|| {
+    let dir = tempdir().expect("Failed to create a temp directory");
+    create_test_hierarchy(dir.path());
+    dir
+});
+
 fn create_test_hierarchy(base_path: &Path) {
     let lowercase_dir = base_path.join("lowercase");
     let uppercase_dir = base_path.join("uppercase");
@@ -51,6 +56,7 @@ fn create_test_hierarchy(base_path: &Path) {
         ("uppercase/QUX.txt", "CONTENT QUX.TXT"),
         ("uppercase/CORGE.txt", "CONTENT CORGE.TXT"),
         ("uppercase/GRAULT.txt", "CONTENT GRAULT.TXT"),
+        (".secret/secret.py", "content secret.py"),
     ];
 
     for (file_path, content) in files {
@@ -72,7 +78,6 @@ fn read_output_file(dir: &Path, file_name: &str) -> String {
 
 mod tests {
     use super::*;
-    use tempfile::TempDir;
 
     struct TestEnv {
         dir: TempDir,
@@ -82,8 +87,8 @@ mod tests {
     impl TestEnv {
         fn new() -> Self {
             init_logger();
+            // Each test writes its output to its own directory, outside the shared hierarchy
             let dir = tempdir().unwrap();
-            create_test_hierarchy(dir.path());
             let output_file = dir.path().join("output.txt").to_str().unwrap().to_string();
             TestEnv { dir, output_file }
         }
@@ -91,7 +96,7 @@ mod tests {
         fn command(&self) -> Command {
             let mut cmd =
                 Command::cargo_bin("code2prompt").expect("Failed to find code2prompt binary");
-            cmd.arg(&self.dir.path().to_str().unwrap())
+            cmd.arg(TEST_DIR.path().to_str().unwrap())
                 .arg("--output")
                 .arg(&self.output_file)
                 .arg("--no-clipboard");
@@ -252,4 +257,210 @@ mod tests {
         assert!(contains("BAZ.py").eval(&output));
         assert!(contains("CONTENT BAZ.PY").eval(&output));
     }
+
+    #[test]
+    fn test_exclude_from_tree_with_absolute_include() {
+        let root = TEST_DIR.path().canonicalize().unwrap();
+
+        // An absolute include prunes the walk to its literal prefix, an include
+        // starting with `**` walks everything: both must render the same prompt
+        for (absolute, anywhere) in [
+            (format!("{}/lowercase/*", root.display()), "**/lowercase/*"),
+            (format!("{}/.secret/*", root.display()), "**/.secret/*"),
+        ] {
+            let pruned_env = TestEnv::new();
+            pruned_env
+                .command()
+                .arg(format!("--include={}", absolute))
+                .arg("--exclude-from-tree")
+                .assert()
+                .success();
+
+            let full_env = TestEnv::new();
+            full_env
+                .command()
+                .arg(format!("--include={}", anywhere))
+                .arg("--exclude-from-tree")
+                .assert()
+                .success();
+
+            let pruned_output = pruned_env.read_output();
+            debug!("Test exclude from tree output:\n{}", pruned_output);
+            assert_eq!(pruned_output, full_env.read_output());
+            assert!(contains("content secret.py").not().eval(&pruned_output));
+            assert!(contains("uppercase").not().eval(&pruned_output));
+        }
+    }
+
+    #[test]
+    fn test_output_order() {
+        let env = TestEnv::new();
+        let output = env.command().arg("--json").output().unwrap();
+        assert!(output.status.success());
+
+        let json: serde_json::Value = serde_json::from_slice(&output.stdout).unwrap();
+        let root = TEST_DIR.path().canonicalize().unwrap();
+        let sorted_files = [
+            "lowercase/bar.py",
+            "lowercase/baz.py",
+            "lowercase/corge.txt",
+            "lowercase/foo.py",
+            "lowercase/grault.txt",
+            "lowercase/qux.txt",
+            "uppercase/BAR.py",
+            "uppercase/BAZ.py",
+            "uppercase/CORGE.txt",
+            "uppercase/FOO.py",
+            "uppercase/GRAULT.txt",
+            "uppercase/QUX.txt",
+        ];
+
+        // Files are listed in path order, whatever order the walker visits them in
+        let files: Vec<&str> = json["files"]
+            .as_array()
+            .unwrap()
+            .iter()
+            .map(|file| file.as_str().unwrap())
+            .collect();
+        let expected_files: Vec<String> = sorted_files
+            .iter()
+            .map(|file| root.join(file).display().to_string())
+            .collect();
+        assert_eq!(files, expected_files);
+
+        // The source tree lists every folder before its sorted children
+        let prompt = json["prompt"].as_str().unwrap();
+        let tree_start = prompt.find("Source Tree:\n\n```\n").unwrap() + "Source Tree:\n\n```\n".len();
+        let tree_end = tree_start + prompt[tree_start..].find("```").unwrap();
+        let tree_names: Vec<&str> = prompt[tree_start..tree_end]
+            .lines()
+            .map(|line| line.trim_start_matches(|c| matches!(c, '├' | '└' | '│' | '─' | ' ' | '\u{a0}')))
+            .filter(|name| !name.is_empty())
+            .collect();
+        let mut expected_names = vec![root.file_name().unwrap().to_str().unwrap()];
+        for folder in ["lowercase", "uppercase"] {
+            expected_names.push(folder);
+            expected_names.extend(
+                sorted_files
+                    .iter()
+                    .filter_map(|file| file.strip_prefix(folder).and_then(|name| name.strip_prefix('/'))),
+            );
+        }
+        assert_eq!(tree_names, expected_names);
+    }
+
+    #[cfg(unix)]
+    #[test]
+    fn test_exclude_from_tree_prunes_symlinks_outside_prefix() {
+        init_logger();
+        let dir = tempdir().unwrap();
+        let root = dir.path().canonicalize().unwrap();
+        create_temp_file(&root, "src/a.py", "content a.py");
+        fs::create_dir_all(root.join("other")).unwrap();
+        std::os::unix::fs::symlink(root.join("src/a.py"), root.join("link.py")).unwrap();
+        std::os::unix::fs::symlink(root.join("src/a.py"), root.join("other/link.py")).unwrap();
+
+        let run = |include: String| {
+            let output_dir = tempdir().unwrap();
+            let output_file = output_dir.path().join("output.txt");
+            Command::cargo_bin("code2prompt")
+                .expect("Failed to find code2prompt binary")
+                .arg(root.to_str().unwrap())
+                .arg(format!("--include={}", include))
+                .arg("--exclude-from-tree")
+                .arg("--output")
+                .arg(&output_file)
+                .arg("--no-clipboard")
+                .assert()
+                .success();
+            read_to_string(&output_file).unwrap()
+        };
+
+        let root_link = format!("`{}`", root.join("link.py").display());
+        let nested_link = format!("`{}`", root.join("other/link.py").display());
+
+        // The full walk follows both symlinks into `src`
+        let full_output = run("**/src/*".to_string());
+        assert!(contains(root_link.as_str()).eval(&full_output));
+        assert!(contains(nested_link.as_str()).eval(&full_output));
+
+        // The pruned walk still reaches the top-level symlink, but never enters `other`
+        let pruned_output = run(format!("{}/src/*", root.display()));
+        debug!("Test exclude from tree symlinks output:\n{}", pruned_output);
+        assert!(contains(root_link.as_str()).eval(&pruned_output));
+        assert!(contains(nested_link.as_str()).not().eval(&pruned_output));
+    }
+
+    #[test]
+    fn test_line_numbers() {
+        init_logger();
+        let dir = tempdir().unwrap();
+        let root = dir.path().canonicalize().unwrap();
+        create_temp_file(&root, "a.py", "first line\nsecond line");
+        create_temp_file(&root, "b.py", "other line");
+
+        let run = |no_codeblock: bool| {
+            let output_dir = tempdir().unwrap();
+            let output_file = output_dir.path().join("output.txt");
+            let mut cmd = Command::cargo_bin("code2prompt").expect("Failed to find code2prompt binary");
+            cmd.arg(root.to_str().unwrap())
+                .arg("--line-number")
+                .arg("--output")
+                .arg(&output_file)
+                .arg("--no-clipboard");
+            if no_codeblock {
+                cmd.arg("--no-codeblock");
+            }
+            cmd.assert().success();
+            read_to_string(&output_file).unwrap()
+        };
+
+        let a_header = format!("`{}`:\n\n", root.join("a.py").display());
+        let b_header = format!("`{}`:", root.join("b.py").display());
+        let numbered = "   1 | first line\n   2 | second line\n";
+
+        let output = run(false);
+        debug!("Test line numbers output:\n{}", output);
+        let block = format!("{}```py\n{}\n```", a_header, numbered);
+        let block_end = output.find(&block).expect("Missing numbered code block") + block.len();
+        let separator = &output[block_end..block_end + output[block_end..].find(&b_header).unwrap()];
+
+        // Without a code block the numbered lines, trailing newline included, are the whole entry
+        let output = run(true);
+        debug!("Test line numbers without code block output:\n{}", output);
+        let entry = format!("{}{}{}{}", a_header, numbered, separator, b_header);
+        assert!(contains(entry.as_str()).eval(&output));
+        assert!(contains("```py").not().eval(&output));
+    }
+
+    #[test]
+    fn test_skip_invalid_and_blank_files() {
+        init_logger();
+        let dir = tempdir().unwrap();
+        let root = dir.path().canonicalize().unwrap();
+        create_temp_file(&root, "good.py", "content good.py");
+        fs::write(root.join("invalid.py"), b"content \xff\xfe invalid.py\n").unwrap();
+        fs::write(root.join("blank.py"), " \n\t\n").unwrap();
+
+        let output = Command::cargo_bin("code2prompt")
+            .expect("Failed to find code2prompt binary")
+            .arg(root.to_str().unwrap())
+            .arg("--json")
+            .arg("--no-clipboard")
+            .output()
+            .unwrap();
+        assert!(output.status.success());
+
+        let json: serde_json::Value = serde_json::from_slice(&output.stdout).unwrap();
+        let good = root.join("good.py").display().to_string();
+        assert_eq!(json["files"], serde_json::json!([good]));
+
+        let prompt = json["prompt"].as_str().unwrap();
+        assert!(contains(format!("`{}`:", good).as_str()).eval(prompt));
+        for skipped in ["invalid.py", "blank.py"] {
+            let header = format!("`{}`:", root.join(skipped).display());
+            assert!(contains(header.as_str()).not().eval(prompt));
+        }
+        assert!(!prompt.contains(char::REPLACEMENT_CHARACTER));
+    }
 }
@@ -0,0 +1,56 @@
+use code2prompt::path::glob_literal_prefix;
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::path::PathBuf;
+
+    fn prefix(patterns: &[&str]) -> PathBuf {
+        let patterns: Vec<String> = patterns.iter().map(|pattern| pattern.to_string()).collect();
+        glob_literal_prefix(&patterns)
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_absolute() {
+        assert_eq!(prefix(&["/repo/src/*.rs"]), PathBuf::from("/repo/src"));
+        assert_eq!(prefix(&["/repo/src/**"]), PathBuf::from("/repo/src"));
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_relative() {
+        assert_eq!(prefix(&["src/*.rs"]), PathBuf::from("src"));
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_recursive_wildcard() {
+        assert_eq!(prefix(&["**/lowercase/*.py"]), PathBuf::new());
+        assert_eq!(prefix(&["/repo/**/src/*.rs"]), PathBuf::from("/repo"));
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_mixed_prefixes() {
+        assert_eq!(
+            prefix(&["/repo/src/a/*.rs", "/repo/src/b/**"]),
+            PathBuf::from("/repo/src")
+        );
+        assert_eq!(prefix(&["/repo/src/*.rs", "/other/*.rs"]), PathBuf::from("/"));
+        assert_eq!(prefix(&["/repo/src/*.rs", "*.py"]), PathBuf::new());
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_character_class() {
+        assert_eq!(prefix(&["/repo/[ab]/*.rs"]), PathBuf::from("/repo"));
+        assert_eq!(prefix(&["/repo/src?/*.rs"]), PathBuf::from("/repo"));
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_file_only() {
+        assert_eq!(prefix(&["foo.py"]), PathBuf::new());
+        assert_eq!(prefix(&["/repo/src/main.rs"]), PathBuf::from("/repo/src"));
+    }
+
+    #[test]
+    fn test_glob_literal_prefix_no_patterns() {
+        assert_eq!(prefix(&[]), PathBuf::new());
+    }
+}
@@ -49,4 +49,21 @@ mod tests {
             Err(e) => panic!("Template rendering failed: {}", e),
         }
     }
+
+    #[test]
+    fn test_render_template_trims_whitespace() {
+        let template_name = "test_template";
+        let handlebars = handlebars_setup("{{text}}", template_name).unwrap();
+
+        for text in [
+            "\u{3000} \n Hello, Bernard! \t\u{3000}\n",
+            "\u{3000}Hello,\u{3000}Bernard!",
+            " \n\u{3000} ",
+            "",
+        ] {
+            let data = json!({ "text": text });
+            let rendered = render_template(&handlebars, template_name, &data).unwrap();
+            assert_eq!(rendered, text.trim());
+        }
+    }
 }
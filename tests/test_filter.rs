@@ -1,8 +1,7 @@
-use code2prompt::filter::should_include_file;
+use code2prompt::filter::{compile_patterns, should_include_file, should_include_path, CompiledPattern};
 use colored::*;
 use once_cell::sync::Lazy;
-use std::fs::{self, File};
-use std::io::Write;
+use std::fs;
 use std::path::Path;
 use tempfile::{tempdir, TempDir};
 
@@ -10,9 +9,8 @@ fn create_temp_file(dir: &Path, name: &str, content: &str) {
     let file_path = dir.join(name);
     let parent_dir = file_path.parent().unwrap();
     fs::create_dir_all(parent_dir).expect(&format!("Failed to create directory: {:?}", parent_dir));
-    let mut file =
-        File::create(&file_path).expect(&format!("Failed to create temp file: {:?}", file_path));
-    writeln!(file, "{}", content).expect(&format!("Failed to write to temp file: {:?}", file_path));
+    fs::write(&file_path, format!("{}\n", content))
+        .expect(&format!("Failed to write to temp file: {:?}", file_path));
 }
 
 static TEST_DIR: Lazy<TempDir> = Lazy::new(|| {
@@ -368,4 +366,66 @@ mod tests {
             include_priority
         ));
     }
+
+    #[test]
+    fn test_should_include_path_compiled_patterns() {
+        let base_path = TEST_DIR.path();
+
+        let include_patterns = compile_patterns(&["*.py".to_string()]);
+        let exclude_patterns = compile_patterns(&["**/uppercase/**".to_string()]);
+        let include_priority = false;
+
+        for file in ["lowercase/foo.py", "lowercase/bar.py", "lowercase/baz.py"] {
+            let path = base_path.join(file);
+            assert!(should_include_path(
+                &path,
+                &include_patterns,
+                &exclude_patterns,
+                include_priority
+            ));
+        }
+
+        for file in ["lowercase/qux.txt", "uppercase/FOO.py", "uppercase/QUX.txt"] {
+            let path = base_path.join(file);
+            assert!(!should_include_path(
+                &path,
+                &include_patterns,
+                &exclude_patterns,
+                include_priority
+            ));
+        }
+    }
+
+    #[test]
+    fn test_compiled_pattern_matches_glob() {
+        for pattern in [
+            "*",
+            "*.py",
+            "*/foo.py",
+            "*\\foo.py",
+            "*.txt",
+            "**/foo.py",
+            "*[.]py",
+            "*uppercase/*",
+        ] {
+            let compiled = CompiledPattern::new(pattern);
+            let glob = glob::Pattern::new(pattern).unwrap();
+            for path in [
+                "/tmp/lowercase/foo.py",
+                "/tmp/lowercase/qux.txt",
+                "/tmp/uppercase/FOO.py",
+                "C:\\tmp\\lowercase\\foo.py",
+                "C:\\tmp\\uppercase\\QUX.txt",
+                "foo.py",
+                "",
+            ] {
+                assert_eq!(compiled.matches(path), glob.matches(path), "{} on {}", pattern, path);
+            }
+        }
+
+        // glob treats `/` and `\` as the same separator on Windows
+        if cfg!(windows) {
+            assert!(CompiledPattern::new("*/foo.py").matches("C:\\tmp\\lowercase\\foo.py"));
+        }
+    }
 }